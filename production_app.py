@@ -1,15 +1,61 @@
 import streamlit as st
-import base64
-import json
+import collections
+import pybase64
+import orjson
 import os
-from typing import List, Set, Optional
+from typing import Any, List, NamedTuple, Optional
 from pydantic import BaseModel, Field
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, SystemMessage
-import pandas as pd
-from PIL import Image
+from langchain_core.output_parsers import JsonOutputParser
+from PIL import Image, ImageOps
 import io
 
+# Longest edge (in pixels) of images sent to Gemini
+MAX_IMAGE_DIMENSION = 1024
+
+# MIME types Gemini accepts for the formats the uploader allows; Pillow opens
+# many phone JPEGs as "MPO", which is still a JPEG stream
+_IMAGE_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "MPO": "image/jpeg"}
+
+# List fields shown in the UI as comma-separated text
+_JOINED_FIELDS = ("color", "occasion", "season", "features")
+
+# Most images analyzed in a single multimodal Gemini call
+MAX_BATCH_SIZE = 10
+
+# Most Gemini analysis calls in flight at once
+MAX_CONCURRENCY = 5
+
+_ANALYZE_PROMPT_TEXT = """You are an expert fashion analyst. Analyze the clothing item in the image and extract detailed information about its properties. 
+Focus on identifying the category, colors, fabric type, pattern, fit, and other relevant fashion attributes.
+Be specific and accurate in your analysis. If certain attributes are not clearly visible, make reasonable inferences based on what you can see.
+Output the information in the specified JSON format."""
+
+# Invariant text part of every single-image analysis request
+_ANALYZE_USER_TEXT = {"type": "text", "text": "Analyze this clothing item and extract its properties."}
+
+_ANALYZE_BATCH_PROMPT_TEXT = _ANALYZE_PROMPT_TEXT + """
+You will receive several images, each preceded by its number. Return a JSON object with an "items" array
+containing exactly one clothing item per image, in the same order as the images."""
+
+_RECOMMEND_PROMPT_TEMPLATE = """You are an expert fashion stylist. Based on the user's preferences and their wardrobe items, 
+recommend complete outfits that match their needs. Consider color coordination, style compatibility, occasion appropriateness, and seasonal suitability.
+
+User's Wardrobe:
+{wardrobe_json}
+
+Guidelines:
+1. Recommend complete outfits (try to include both top and bottom wear when applicable)
+2. Consider color harmony and style coherence
+3. Match the occasion and season specified by the user
+4. Provide practical styling advice
+5. Maximum {num_recommendations} outfit recommendations
+6. Only use item IDs that exist in the wardrobe
+
+Respond with a JSON object with the keys "recommended_items" (list of item IDs), "reasoning" (string)
+and "style_tips" (list of strings), in that order."""
+
 # Pydantic Models for structured data extraction
 class ClothingItem(BaseModel):
     category: str = Field(..., description="Category of the clothing item (e.g., T-Shirt, Dress, Pants, Shorts)")
@@ -23,120 +69,341 @@ class ClothingItem(BaseModel):
     neck_type: str = Field(..., description="Neck type (Round, V-Neck, Collar, etc.)")
     occasion: List[str] = Field(..., description="Suitable occasions")
     season: List[str] = Field(..., description="Suitable seasons")
-    features: Set[str] = Field(..., description="Special features")
+    features: List[str] = Field(..., description="Special features")
+
+class ClothingBatch(BaseModel):
+    items: List[ClothingItem] = Field(..., description="One analyzed clothing item per image, in image order")
 
 class OutfitRecommendation(BaseModel):
     recommended_items: List[str] = Field(..., description="List of clothing item IDs for the recommended outfit")
     reasoning: str = Field(..., description="Explanation for why this outfit was recommended")
     style_tips: List[str] = Field(..., description="Additional styling tips")
 
+def _coerce_item_ids(item_ids):
+    """Return wardrobe item ids as strings, however the model typed them"""
+    if not isinstance(item_ids, list):
+        return []
+    return [str(item_id) for item_id in item_ids]
+
+class LLMClients(NamedTuple):
+    """Gemini runnables shared by every StyleSyncBot using the same API key"""
+    structured_llm: Any
+    batch_llm: Any
+    recommendation_stream_llm: Any
+
+@st.cache_resource
+def get_llm_clients(api_key: str) -> LLMClients:
+    """Build the Gemini clients once per API key and share them across sessions and reruns"""
+    # A single ClothingItem fits comfortably in 768 output tokens
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-exp",
+        temperature=0.1,
+        api_key=api_key,
+        max_tokens=768,
+        timeout=30,
+        max_retries=2,
+    )
+    # Recommendations carry reasoning and tips, so allow a longer response
+    recommendation_chat_llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-exp",
+        temperature=0.1,
+        api_key=api_key,
+        max_tokens=1536,
+        timeout=30,
+        max_retries=2,
+    )
+    # Batched analysis returns up to MAX_BATCH_SIZE items in one response
+    batch_chat_llm = ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash-exp",
+        temperature=0.1,
+        api_key=api_key,
+        max_tokens=768 * MAX_BATCH_SIZE,
+        timeout=60,
+        max_retries=2,
+    )
+    return LLMClients(
+        structured_llm=llm.with_structured_output(ClothingItem, method="json-mode"),
+        batch_llm=batch_chat_llm.with_structured_output(ClothingBatch, method="json-mode"),
+        # Forces a JSON response but not the OutfitRecommendation schema; key names and order
+        # are only requested in the prompt, so the stream consumer coerces ids itself
+        recommendation_stream_llm=(
+            recommendation_chat_llm.bind(generation_config={"response_mime_type": "application/json"})
+            | JsonOutputParser()
+        ),
+    )
+
 class StyleSyncBot:
     def __init__(self, api_key: str):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
-            temperature=0.1,
-            api_key=api_key,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-        )
-        self.structured_llm = self.llm.with_structured_output(ClothingItem, method="json-mode")
-        self.recommendation_llm = self.llm.with_structured_output(OutfitRecommendation, method="json-mode")
+        # The clients are stateless and shared; the wardrobe stays per session
+        clients = get_llm_clients(api_key)
+        self.structured_llm = clients.structured_llm
+        self.batch_llm = clients.batch_llm
+        self.recommendation_stream_llm = clients.recommendation_stream_llm
         self.wardrobe = []
+        self._wardrobe_json_cache = None
+        self._by_id = {}
+        self._category_counts = collections.Counter()
+        # Pre-joined list fields per item id, kept out of the item dicts sent to Gemini
+        self._display_strings = {}
+        # Bumped on every wardrobe change so derived data can be cached per version
+        self._version = 0
+        self._export_cache = None
+        self._rec_cache = {}
+        # System prompts are static, or only change with the wardrobe, so build them once
+        self._analyze_system_msg = SystemMessage(content=[{"type": "text", "text": _ANALYZE_PROMPT_TEXT}])
+        self._analyze_batch_system_msg = SystemMessage(content=[{"type": "text", "text": _ANALYZE_BATCH_PROMPT_TEXT}])
+        self._recommend_system_msgs = {}
 
     def encode_image(self, image_bytes):
-        """Encode image bytes to base64"""
-        return base64.b64encode(image_bytes).decode("utf-8")
+        """Encode image bytes to base64 and return them with their real MIME type.
+
+        Images larger than MAX_IMAGE_DIMENSION are downscaled and re-encoded as JPEG,
+        which is far smaller than the original upload for typical phone photos.
+        Formats other than PNG and JPEG are re-encoded as JPEG as well.
+        """
+        image = Image.open(io.BytesIO(image_bytes))
+        mime_type = _IMAGE_MIME_TYPES.get(image.format)
+        # Unsupported formats and oversized images are re-encoded as JPEG
+        if mime_type is None or max(image.size) > MAX_IMAGE_DIMENSION:
+            # Re-encoding drops EXIF, so bake the orientation into the pixels first
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+            if image.mode in ("RGBA", "LA", "P"):
+                # JPEG has no alpha channel; put transparent areas on white rather than black
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            buffer = io.BytesIO()
+            image.convert("RGB").save(buffer, format="JPEG", quality=85)
+            image_bytes = buffer.getvalue()
+            mime_type = "image/jpeg"
+        return mime_type, pybase64.b64encode_as_string(image_bytes)
+
+    def image_data_url(self, image_bytes):
+        """Encode image bytes as a data URL ready to send to Gemini"""
+        mime_type, image_base64 = self.encode_image(image_bytes)
+        return f"data:{mime_type};base64,{image_base64}"
+
+    def build_analysis_prompt(self, image_url):
+        """Build the analysis prompt for a single encoded clothing image"""
+        human_msg = HumanMessage(
+            content=[
+                _ANALYZE_USER_TEXT,
+                {"type": "image_url", "image_url": image_url}
+            ]
+        )
+        return [self._analyze_system_msg, human_msg]
 
     def analyze_clothing_image(self, image_bytes):
         """Analyze uploaded clothing image and extract structured data"""
         try:
-            image_base64 = self.encode_image(image_bytes)
-            
-            prompt = [
-                SystemMessage(
-                    content=[
-                        {"type": "text", "text": """You are an expert fashion analyst. Analyze the clothing item in the image and extract detailed information about its properties. 
-                        Focus on identifying the category, colors, fabric type, pattern, fit, and other relevant fashion attributes.
-                        Be specific and accurate in your analysis. If certain attributes are not clearly visible, make reasonable inferences based on what you can see.
-                        Output the information in the specified JSON format."""}
-                    ]
-                ),
-                HumanMessage(
-                    content=[
-                        {"type": "text", "text": "Analyze this clothing item and extract its properties."},
-                        {"type": "image_url", "image_url": f"data:image/jpeg;base64,{image_base64}"}
-                    ]
-                )
-            ]
-            
+            prompt = self.build_analysis_prompt(self.image_data_url(image_bytes))
             response = self.structured_llm.invoke(prompt)
             return response
         except Exception as e:
             st.error(f"Error analyzing image: {str(e)}")
             return None
 
+    def _encode_images(self, list_of_bytes):
+        """Encode each image once so batched and per-image prompts can share it.
+
+        Returns the data URLs and a parallel list of error messages; a failed
+        image has a None URL and its reason in the error list.
+        """
+        image_urls = []
+        errors = []
+        for image_bytes in list_of_bytes:
+            try:
+                image_urls.append(self.image_data_url(image_bytes))
+                errors.append(None)
+            except Exception as e:
+                image_urls.append(None)
+                errors.append(f"Error analyzing image: {str(e)}")
+        return image_urls, errors
+
+    def analyze_many(self, image_urls):
+        """Analyze several encoded clothing images concurrently, one call each, preserving input order.
+
+        Returns the analyzed items and a parallel list of error messages (None where analysis succeeded).
+        """
+        results = [None] * len(image_urls)
+        errors = [None] * len(image_urls)
+        positions = [position for position, image_url in enumerate(image_urls) if image_url is not None]
+        prompts = [self.build_analysis_prompt(image_urls[position]) for position in positions]
+        
+        # batch fans the sync client out over a thread pool, so no event loop is bound to the shared client
+        responses = self.structured_llm.batch(
+            prompts, config={"max_concurrency": MAX_CONCURRENCY}, return_exceptions=True
+        )
+        for position, response in zip(positions, responses):
+            if isinstance(response, Exception):
+                errors[position] = f"Error analyzing image: {str(response)}"
+            else:
+                results[position] = response
+        return results, errors
+
+    def build_batch_analysis_prompt(self, image_urls):
+        """Build one prompt that asks for every encoded image in the chunk to be analyzed"""
+        content = [{"type": "text", "text": f"Analyze these {len(image_urls)} clothing items and extract their properties."}]
+        for index, image_url in enumerate(image_urls, start=1):
+            content.append({"type": "text", "text": f"Image {index}:"})
+            content.append({"type": "image_url", "image_url": image_url})
+        return [self._analyze_batch_system_msg, HumanMessage(content=content)]
+
+    def analyze_batch(self, image_bytes_list):
+        """Analyze clothing images in as few Gemini calls as possible, preserving input order.
+
+        Nothing is rendered here, so the caller can show the messages after a rerun.
+        Returns the analyzed items, a parallel list of per-image error messages, and
+        a list of notices explaining why any chunk fell back to per-image analysis.
+        """
+        image_urls, errors = self._encode_images(image_bytes_list)
+        positions = [position for position, image_url in enumerate(image_urls) if image_url is not None]
+        chunks = [
+            positions[start:start + MAX_BATCH_SIZE]
+            for start in range(0, len(positions), MAX_BATCH_SIZE)
+        ]
+        prompts = [
+            self.build_batch_analysis_prompt([image_urls[position] for position in chunk])
+            for chunk in chunks
+        ]
+        responses = self.batch_llm.batch(
+            prompts, config={"max_concurrency": MAX_CONCURRENCY}, return_exceptions=True
+        )
+        
+        results = [None] * len(image_urls)
+        notices = []
+        for chunk, response in zip(chunks, responses):
+            if isinstance(response, ClothingBatch) and len(response.items) == len(chunk):
+                for position, item in zip(chunk, response.items):
+                    results[position] = item
+                continue
+            
+            if isinstance(response, Exception):
+                notices.append(f"Error analyzing images together, retrying one by one: {str(response)}")
+            elif response is None:
+                notices.append("Batched analysis returned no structured output, retrying one by one")
+            else:
+                notices.append("Batched analysis returned an unexpected number of items, retrying one by one")
+            
+            # Reuse the images encoded above rather than encoding them again
+            chunk_items, chunk_errors = self.analyze_many([image_urls[position] for position in chunk])
+            for position, item, error in zip(chunk, chunk_items, chunk_errors):
+                results[position] = item
+                errors[position] = error
+        return results, errors, notices
+
     def add_to_wardrobe(self, clothing_item: ClothingItem):
         """Add analyzed clothing item to user's wardrobe"""
-        item_dict = json.loads(clothing_item.model_dump_json())
-        item_dict['id'] = len(self.wardrobe) + 1
+        item_dict = clothing_item.model_dump(mode="json")
+        # Features are a plain list on the model; drop repeats while keeping their order
+        item_dict['features'] = list(dict.fromkeys(item_dict['features']))
+        item_dict['id'] = str(len(self.wardrobe) + 1)
         self.wardrobe.append(item_dict)
+        self._by_id[item_dict['id']] = item_dict
+        self._category_counts[item_dict['category']] += 1
+        self._display_strings[item_dict['id']] = {
+            field: ', '.join(item_dict[field]) for field in _JOINED_FIELDS
+        }
+        self._version += 1
+        self._rec_cache.clear()
+        self._wardrobe_json_cache = None
+        self._recommend_system_msgs.clear()
         return item_dict['id']
 
-    def get_outfit_recommendations(self, user_preferences: str, num_recommendations: int = 3):
-        """Get outfit recommendations based on user preferences"""
+    def _get_recommend_system_msg(self, num_recommendations: int):
+        """Return the recommendation system message, rebuilding it only after the wardrobe changes"""
+        system_msg = self._recommend_system_msgs.get(num_recommendations)
+        if system_msg is None:
+            # Serialize the wardrobe only when it has changed since the last call
+            if self._wardrobe_json_cache is None:
+                self._wardrobe_json_cache = orjson.dumps(self.wardrobe).decode()
+            text = _RECOMMEND_PROMPT_TEMPLATE.format(
+                wardrobe_json=self._wardrobe_json_cache,
+                num_recommendations=num_recommendations,
+            )
+            system_msg = SystemMessage(content=[{"type": "text", "text": text}])
+            self._recommend_system_msgs[num_recommendations] = system_msg
+        return system_msg
+
+    def _build_recommendation_prompt(self, user_preferences: str, num_recommendations: int):
+        """Build the recommendation prompt for the given preferences"""
+        return [
+            self._get_recommend_system_msg(num_recommendations),
+            HumanMessage(
+                content=[
+                    {"type": "text", "text": f"User preferences: {user_preferences}"}
+                ]
+            )
+        ]
+
+    def stream_outfit_recommendations(self, user_preferences: str, num_recommendations: int = 3):
+        """Yield (snapshot, is_final) pairs of OutfitRecommendation as Gemini generates them.
+
+        Partial snapshots are built without validation, so fields that have not
+        been generated yet are None (or empty lists). recommended_items stays empty
+        until the list is complete, which for out-of-order keys means until the
+        final snapshot. Item ids are coerced to strings, since the stream is not
+        schema-constrained and Gemini may emit them as numbers. Only the validated
+        recommendation is yielded with is_final set; if the stream fails, no final
+        pair is yielded.
+        """
         if not self.wardrobe:
-            return None
+            return
+        
+        # Identical preferences against an unchanged wardrobe get the same answer
+        key = (user_preferences, self._version, num_recommendations)
+        if key in self._rec_cache:
+            yield self._rec_cache[key], True
+            return
         
         try:
-            prompt = [
-                SystemMessage(
-                    content=[
-                        {"type": "text", "text": f"""You are an expert fashion stylist. Based on the user's preferences and their wardrobe items, 
-                        recommend complete outfits that match their needs. Consider color coordination, style compatibility, occasion appropriateness, and seasonal suitability.
-                        
-                        User's Wardrobe:
-                        {json.dumps(self.wardrobe, indent=2)}
-                        
-                        Guidelines:
-                        1. Recommend complete outfits (try to include both top and bottom wear when applicable)
-                        2. Consider color harmony and style coherence
-                        3. Match the occasion and season specified by the user
-                        4. Provide practical styling advice
-                        5. Maximum {num_recommendations} outfit recommendations
-                        6. Only use item IDs that exist in the wardrobe"""}
-                    ]
-                ),
-                HumanMessage(
-                    content=[
-                        {"type": "text", "text": f"User preferences: {user_preferences}"}
-                    ]
-                )
-            ]
+            prompt = self._build_recommendation_prompt(user_preferences, num_recommendations)
+            partial = None
+            for partial in self.recommendation_stream_llm.stream(prompt):
+                if isinstance(partial, dict):
+                    # Partial parsing closes half-streamed ids ("1" of "12"), so the id list
+                    # is only trusted once a later key has started
+                    keys = list(partial)
+                    items_complete = "recommended_items" in keys and keys[-1] != "recommended_items"
+                    yield OutfitRecommendation.model_construct(
+                        recommended_items=_coerce_item_ids(partial["recommended_items"]) if items_complete else [],
+                        reasoning=partial.get("reasoning"),
+                        style_tips=partial.get("style_tips") or [],
+                    ), False
             
-            response = self.recommendation_llm.invoke(prompt)
-            return response
+            if isinstance(partial, dict) and "recommended_items" in partial:
+                partial = {**partial, "recommended_items": _coerce_item_ids(partial["recommended_items"])}
+            response = OutfitRecommendation.model_validate(partial)
+            self._rec_cache[key] = response
+            yield response, True
         except Exception as e:
             st.error(f"Error getting recommendations: {str(e)}")
-            return None
+
+    def export_wardrobe_json(self):
+        """Serialize the wardrobe for download, reusing the result until the wardrobe changes"""
+        if self._export_cache is None or self._export_cache[0] != self._version:
+            wardrobe_json = orjson.dumps(self.wardrobe, option=orjson.OPT_INDENT_2).decode()
+            self._export_cache = (self._version, wardrobe_json)
+        return self._export_cache[1]
 
     def get_item_by_id(self, item_id: str):
         """Get wardrobe item by ID"""
-        for item in self.wardrobe:
-            if str(item['id']) == str(item_id):
-                return item
-        return None
+        return self._by_id.get(item_id)
 
-    def display_outfit_recommendation(self, recommendation: OutfitRecommendation):
-        """Display outfit recommendation in a formatted way"""
-        st.subheader("🎯 Recommended Outfit")
-        
-        # Display recommended items
+    def get_display_strings(self, item_id: str):
+        """Get the pre-joined list fields of a wardrobe item by ID"""
+        return self._display_strings.get(item_id)
+
+    def _display_outfit_items(self, recommended_items: List[str]):
+        """Display the wardrobe items that make up an outfit"""
         st.write("**Outfit Items:**")
-        for item_id in recommendation.recommended_items:
+        for item_id in recommended_items:
             item = self.get_item_by_id(item_id)
             if item:
-                with st.expander(f"Item {item_id}: {item['category']} - {', '.join(item['color'])}"):
+                joined = self.get_display_strings(item_id)
+                with st.expander(f"Item {item_id}: {item['category']} - {joined['color']}"):
                     col1, col2 = st.columns(2)
                     with col1:
                         st.write(f"**Description:** {item['description']}")
@@ -144,19 +411,199 @@ class StyleSyncBot:
                         st.write(f"**Pattern:** {item['pattern']}")
                         st.write(f"**Fit:** {item['fit']}")
                     with col2:
-                        st.write(f"**Occasions:** {', '.join(item['occasion'])}")
-                        st.write(f"**Seasons:** {', '.join(item['season'])}")
-                        st.write(f"**Features:** {', '.join(item['features'])}")
+                        st.write(f"**Occasions:** {joined['occasion']}")
+                        st.write(f"**Seasons:** {joined['season']}")
+                        st.write(f"**Features:** {joined['features']}")
+
+    def display_outfit_recommendation_stream(self, snapshots):
+        """Display streamed recommendation snapshots as they arrive.
+
+        Returns the validated recommendation, or None (with the partial output
+        cleared) if the stream ended without one.
+        """
+        header_placeholder = st.empty()
+        header_placeholder.subheader("🎯 Recommended Outfit")
+        items_placeholder = st.empty()
+        reasoning_placeholder = st.empty()
+        tips_placeholder = st.empty()
         
-        # Display reasoning
-        st.write("**Why this outfit works:**")
-        st.write(recommendation.reasoning)
+        recommendation = None
+        rendered_items = None
+        for recommendation, is_final in snapshots:
+            # The id list only arrives once complete, so draw the items once per distinct list
+            if recommendation.recommended_items and recommendation.recommended_items != rendered_items:
+                with items_placeholder.container():
+                    self._display_outfit_items(recommendation.recommended_items)
+                rendered_items = recommendation.recommended_items
+            
+            if recommendation.reasoning is not None:
+                reasoning_placeholder.markdown(f"**Why this outfit works:**\n\n{recommendation.reasoning}")
+            
+            if recommendation.style_tips:
+                tips = "\n\n".join(f"• {tip}" for tip in recommendation.style_tips)
+                tips_placeholder.markdown(f"**Styling Tips:**\n\n{tips}")
+            
+            if is_final:
+                return recommendation
+        
+        # The stream failed before a validated result, so don't leave half-streamed output on screen
+        header_placeholder.empty()
+        items_placeholder.empty()
+        reasoning_placeholder.empty()
+        tips_placeholder.empty()
+        return None
+
+@st.fragment
+def render_add_tab():
+    """Render the Add Clothing tab; widget changes here rerun only this tab"""
+    st.header("📷 Add Clothing to Your Wardrobe")
+    
+    uploaded_files = st.file_uploader(
+        "Upload clothing images", 
+        accept_multiple_files=True,
+        type=['png', 'jpg', 'jpeg'],
+        help="Upload clear images of individual clothing items"
+    )
+    
+    if uploaded_files and st.session_state.bot:
+        for uploaded_file in uploaded_files:
+            with st.expander(f"Preview: {uploaded_file.name}"):
+                # Display image
+                st.image(uploaded_file, caption=uploaded_file.name, use_column_width=True)
+        
+        if st.button(f"Analyze {len(uploaded_files)} item(s)", key="analyze_uploads"):
+            with st.spinner("Analyzing clothing items..."):
+                # Get image bytes
+                images_bytes = [uploaded_file.getvalue() for uploaded_file in uploaded_files]
+                
+                # Analyze all images in batched calls
+                clothing_items, errors, notices = st.session_state.bot.analyze_batch(images_bytes)
+            
+            # Keep the messages in session state so they survive the rerun below
+            st.session_state.last_analysis_notices = notices
+            st.session_state.last_analysis = []
+            for uploaded_file, clothing_item, error in zip(uploaded_files, clothing_items, errors):
+                if clothing_item:
+                    # Add to wardrobe
+                    item_id = st.session_state.bot.add_to_wardrobe(clothing_item)
+                    st.session_state.last_analysis.append(
+                        (uploaded_file.name, item_id, st.session_state.bot.get_item_by_id(item_id), None)
+                    )
+                else:
+                    st.session_state.last_analysis.append((uploaded_file.name, None, None, error))
+            
+            # The wardrobe changed, so refresh the sidebar and the other tabs too
+            st.rerun()
+    
+    for notice in st.session_state.last_analysis_notices:
+        st.warning(notice)
+    
+    for file_name, item_id, item_data, error in st.session_state.last_analysis:
+        if item_id:
+            with st.expander(f"✅ {file_name} added to wardrobe as Item #{item_id}"):
+                # Display analysis results
+                st.json(item_data)
+        elif error:
+            st.error(f"Could not analyze {file_name}. {error}")
+        else:
+            st.error(f"Could not analyze {file_name}. Please try again.")
+
+@st.fragment
+def render_reco_tab():
+    """Render the Get Recommendations tab; widget changes here rerun only this tab"""
+    st.header("👔 Get Personalized Recommendations")
+    
+    if not st.session_state.bot or not st.session_state.bot.wardrobe:
+        st.warning("Please add some clothing items to your wardrobe first!")
+    else:
+        # User preferences input
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            occasion = st.selectbox("Occasion", [
+                "Casual", "Work/Professional", "Party", "Date Night", 
+                "Beach/Pool", "Gym/Athletic", "Formal Event", "Travel"
+            ])
+            
+            season = st.selectbox("Season", [
+                "Spring", "Summer", "Fall", "Winter", "Any"
+            ])
+        
+        with col2:
+            time_of_day = st.selectbox("Time of Day", [
+                "Morning", "Afternoon", "Evening", "Night", "Any"
+            ])
+            
+            style_preference = st.selectbox("Style Preference", [
+                "Comfortable", "Stylish", "Professional", "Trendy", 
+                "Classic", "Minimalist", "Bold"
+            ])
+        
+        additional_notes = st.text_area(
+            "Additional preferences or requirements:",
+            placeholder="e.g., prefer bright colors, need pockets, avoid tight fits..."
+        )
+        
+        # Combine preferences
+        user_preferences = f"""
+        Occasion: {occasion}
+        Season: {season}
+        Time of Day: {time_of_day}
+        Style Preference: {style_preference}
+        Additional Notes: {additional_notes}
+        """
+        
+        if st.button("🎯 Get Recommendations", type="primary"):
+            with st.spinner("Creating your perfect outfit..."):
+                recommendations = st.session_state.bot.display_outfit_recommendation_stream(
+                    st.session_state.bot.stream_outfit_recommendations(user_preferences)
+                )
+                
+                if not recommendations:
+                    st.error("Could not generate recommendations. Please try again.")
+
+@st.fragment
+def render_wardrobe_tab():
+    """Render the My Wardrobe tab; widget changes here rerun only this tab"""
+    st.header("👗 My Wardrobe")
+    
+    if st.session_state.bot and st.session_state.bot.wardrobe:
+        # Display wardrobe items
+        for item in st.session_state.bot.wardrobe:
+            joined = st.session_state.bot.get_display_strings(item['id'])
+            with st.expander(f"Item #{item['id']}: {item['category']} - {joined['color']}"):
+                col1, col2, col3 = st.columns(3)
+                
+                with col1:
+                    st.write(f"**Category:** {item['category']}")
+                    st.write(f"**Colors:** {joined['color']}")
+                    st.write(f"**Pattern:** {item['pattern']}")
+                    st.write(f"**Fabric:** {item['fabric']}")
+                
+                with col2:
+                    st.write(f"**Fit:** {item['fit']}")
+                    st.write(f"**Sleeve Length:** {item['sleeve_length']}")
+                    st.write(f"**Neck Type:** {item['neck_type']}")
+                    st.write(f"**Gender:** {item['gender']}")
+                
+                with col3:
+                    st.write(f"**Occasions:** {joined['occasion']}")
+                    st.write(f"**Seasons:** {joined['season']}")
+                    st.write(f"**Features:** {joined['features']}")
+                
+                st.write(f"**Description:** {item['description']}")
         
-        # Display styling tips
-        if recommendation.style_tips:
-            st.write("**Styling Tips:**")
-            for tip in recommendation.style_tips:
-                st.write(f"• {tip}")
+        # Export wardrobe
+        if st.button("📥 Export Wardrobe as JSON"):
+            wardrobe_json = st.session_state.bot.export_wardrobe_json()
+            st.download_button(
+                label="Download Wardrobe JSON",
+                data=wardrobe_json,
+                file_name="my_wardrobe.json",
+                mime="application/json"
+            )
+    else:
+        st.info("Your wardrobe is empty. Start by adding some clothing items!")
 
 def main():
     st.set_page_config(
@@ -173,6 +620,10 @@ def main():
         st.session_state.bot = None
     if 'wardrobe_items' not in st.session_state:
         st.session_state.wardrobe_items = []
+    if 'last_analysis' not in st.session_state:
+        st.session_state.last_analysis = []
+    if 'last_analysis_notices' not in st.session_state:
+        st.session_state.last_analysis_notices = []
     
     # Sidebar for API key and settings
     with st.sidebar:
@@ -196,15 +647,12 @@ def main():
         
         st.header("📊 Wardrobe Stats")
         if st.session_state.bot and st.session_state.bot.wardrobe:
-            wardrobe_df = pd.DataFrame(st.session_state.bot.wardrobe)
             st.write(f"**Total Items:** {len(st.session_state.bot.wardrobe)}")
             
             # Category distribution
-            if not wardrobe_df.empty:
-                category_counts = wardrobe_df['category'].value_counts()
-                st.write("**Categories:**")
-                for category, count in category_counts.items():
-                    st.write(f"• {category}: {count}")
+            st.write("**Categories:**")
+            for category, count in st.session_state.bot._category_counts.most_common():
+                st.write(f"• {category}: {count}")
         else:
             st.write("No items in wardrobe yet")
     
@@ -217,134 +665,13 @@ def main():
     tab1, tab2, tab3 = st.tabs(["📷 Add Clothing", "👔 Get Recommendations", "👗 My Wardrobe"])
     
     with tab1:
-        st.header("📷 Add Clothing to Your Wardrobe")
-        
-        uploaded_files = st.file_uploader(
-            "Upload clothing images", 
-            accept_multiple_files=True,
-            type=['png', 'jpg', 'jpeg'],
-            help="Upload clear images of individual clothing items"
-        )
-        
-        if uploaded_files and st.session_state.bot:
-            for uploaded_file in uploaded_files:
-                with st.expander(f"Analyzing: {uploaded_file.name}"):
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # Display image
-                        image = Image.open(uploaded_file)
-                        st.image(image, caption=uploaded_file.name, use_column_width=True)
-                    
-                    with col2:
-                        if st.button(f"Analyze {uploaded_file.name}", key=f"analyze_{uploaded_file.name}"):
-                            with st.spinner("Analyzing clothing item..."):
-                                # Get image bytes
-                                image_bytes = uploaded_file.getvalue()
-                                
-                                # Analyze the image
-                                clothing_item = st.session_state.bot.analyze_clothing_image(image_bytes)
-                                
-                                if clothing_item:
-                                    # Add to wardrobe
-                                    item_id = st.session_state.bot.add_to_wardrobe(clothing_item)
-                                    
-                                    st.success(f"✅ Added to wardrobe as Item #{item_id}")
-                                    
-                                    # Display analysis results
-                                    st.json(json.loads(clothing_item.model_dump_json()))
+        render_add_tab()
     
     with tab2:
-        st.header("👔 Get Personalized Recommendations")
-        
-        if not st.session_state.bot or not st.session_state.bot.wardrobe:
-            st.warning("Please add some clothing items to your wardrobe first!")
-        else:
-            # User preferences input
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                occasion = st.selectbox("Occasion", [
-                    "Casual", "Work/Professional", "Party", "Date Night", 
-                    "Beach/Pool", "Gym/Athletic", "Formal Event", "Travel"
-                ])
-                
-                season = st.selectbox("Season", [
-                    "Spring", "Summer", "Fall", "Winter", "Any"
-                ])
-            
-            with col2:
-                time_of_day = st.selectbox("Time of Day", [
-                    "Morning", "Afternoon", "Evening", "Night", "Any"
-                ])
-                
-                style_preference = st.selectbox("Style Preference", [
-                    "Comfortable", "Stylish", "Professional", "Trendy", 
-                    "Classic", "Minimalist", "Bold"
-                ])
-            
-            additional_notes = st.text_area(
-                "Additional preferences or requirements:",
-                placeholder="e.g., prefer bright colors, need pockets, avoid tight fits..."
-            )
-            
-            # Combine preferences
-            user_preferences = f"""
-            Occasion: {occasion}
-            Season: {season}
-            Time of Day: {time_of_day}
-            Style Preference: {style_preference}
-            Additional Notes: {additional_notes}
-            """
-            
-            if st.button("🎯 Get Recommendations", type="primary"):
-                with st.spinner("Creating your perfect outfit..."):
-                    recommendations = st.session_state.bot.get_outfit_recommendations(user_preferences)
-                    
-                    if recommendations:
-                        st.session_state.bot.display_outfit_recommendation(recommendations)
-                    else:
-                        st.error("Could not generate recommendations. Please try again.")
+        render_reco_tab()
     
     with tab3:
-        st.header("👗 My Wardrobe")
-        
-        if st.session_state.bot and st.session_state.bot.wardrobe:
-            # Display wardrobe items
-            for item in st.session_state.bot.wardrobe:
-                with st.expander(f"Item #{item['id']}: {item['category']} - {', '.join(item['color'])}"):
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        st.write(f"**Category:** {item['category']}")
-                        st.write(f"**Colors:** {', '.join(item['color'])}")
-                        st.write(f"**Pattern:** {item['pattern']}")
-                        st.write(f"**Fabric:** {item['fabric']}")
-                    
-                    with col2:
-                        st.write(f"**Fit:** {item['fit']}")
-                        st.write(f"**Sleeve Length:** {item['sleeve_length']}")
-                        st.write(f"**Neck Type:** {item['neck_type']}")
-                        st.write(f"**Gender:** {item['gender']}")
-                    
-                    with col3:
-                        st.write(f"**Occasions:** {', '.join(item['occasion'])}")
-                        st.write(f"**Seasons:** {', '.join(item['season'])}")
-                        st.write(f"**Features:** {', '.join(item['features'])}")
-                    
-                    st.write(f"**Description:** {item['description']}")
-            
-            # Export wardrobe
-            if st.button("📥 Export Wardrobe as JSON"):
-                wardrobe_json = json.dumps(st.session_state.bot.wardrobe, indent=2)
-                st.download_button(
-                    label="Download Wardrobe JSON",
-                    data=wardrobe_json,
-                    file_name="my_wardrobe.json",
-                    mime="application/json"
-                )
-        else:
-            st.info("Your wardrobe is empty. Start by adding some clothing items!")
+        render_wardrobe_tab()
 
 if __name__ == "__main__":
     # Set port for Railway deployment